@@ -1,28 +1,41 @@
 import os
+import asyncio
 import io
 import csv
-import json
-import qrcode
-from datetime import datetime
-from typing import List, Optional, Dict, Any
-
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, Header, Request
+import orjson
+import time
+import hashlib
+import segno
+import queue
+import re
+import secrets
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from datetime import datetime, timezone
+from typing import List, Optional, Dict, Any, Tuple, DefaultDict
+
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, Header, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
 from pydantic import BaseModel
+from starlette.datastructures import UploadFile as StarletteUploadFile
 
-from database import db, create_document, get_documents
+from database import db, create_document
 from schemas import Form as FormSchema, Submission as SubmissionSchema
 
 # Google APIs
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaIoBaseUpload
+from googleapiclient.http import HttpRequest, MediaIoBaseUpload
+import google_auth_httplib2
+import httplib2
 
-# Firebase Admin for token verification (Auth)
-import firebase_admin
-from firebase_admin import auth as fb_auth, credentials as fb_credentials
+# Offline Firebase ID token verification (Auth)
+import jwt
 
 # --- Config ---
 SCOPES = [
@@ -33,19 +46,32 @@ MASTER_SPREADSHEET_ID = os.getenv("MASTER_SPREADSHEET_ID")  # Spreadsheet to hos
 DRIVE_FOLDER_ID = os.getenv("DRIVE_FOLDER_ID")  # Folder to store uploads
 SERVICE_ACCOUNT_JSON = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON")  # JSON string or path
 PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://localhost:3000")
-
-# Initialize Firebase Admin if credentials provided
-if not firebase_admin._apps:
+DRIVE_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # must be a multiple of 256 KiB
+CSV_CURSOR_BATCH_SIZE = 500
+SUBMISSION_FORM_INDEX = [("form_id", 1), ("created_at", -1)]
+FORM_OWNER_INDEX = [("owner_uid", 1), ("created_at", -1)]
+FORM_CACHE_CONTROL = "public, max-age=60"
+FORM_LIST_FIELDS = ["title", "description", "share_slug", "sheet_name", "created_at"]
+CSV_CHUNK_SIZE = 64 * 1024  # flush CSV output to the client roughly every 64 KB
+
+# Firebase project used to validate ID token audience/issuer; falls back to the
+# project_id in FIREBASE_SERVICE_ACCOUNT_JSON
+FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID")
+if not FIREBASE_PROJECT_ID:
     fb_creds_json = os.getenv("FIREBASE_SERVICE_ACCOUNT_JSON")
     try:
         if fb_creds_json:
-            cred = fb_credentials.Certificate(json.loads(fb_creds_json))
-            firebase_admin.initialize_app(cred)
+            FIREBASE_PROJECT_ID = orjson.loads(fb_creds_json).get("project_id")
     except Exception:
-        # ignore init error; endpoints that need auth will fail gracefully
+        # ignore parse error; endpoints that need auth will fail gracefully
         pass
 
-app = FastAPI(title="SmartForm Builder API")
+# Google's signing keys for Firebase ID tokens; cached in-process and refetched
+# automatically when a token carries an unknown kid (key rotation)
+FIREBASE_JWKS_URL = "https://www.googleapis.com/service_accounts/v1/jwk/securetoken@system.gserviceaccount.com"
+jwks_client = jwt.PyJWKClient(FIREBASE_JWKS_URL, cache_keys=True, lifespan=3600)
+
+app = FastAPI(title="SmartForm Builder API", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -58,53 +84,136 @@ app.add_middleware(
 
 # --- Helpers ---
 
-def get_google_services():
-    """Build Sheets and Drive services from service account credentials."""
-    creds = None
-    if SERVICE_ACCOUNT_JSON:
-        try:
-            # Allow passing either full JSON string or a file path
-            if SERVICE_ACCOUNT_JSON.strip().startswith("{"):
-                info = json.loads(SERVICE_ACCOUNT_JSON)
-                creds = Credentials.from_service_account_info(info, scopes=SCOPES)
-            else:
-                creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_JSON, scopes=SCOPES)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Invalid Google service account credentials: {e}")
-    else:
+_services_lock = threading.Lock()
+
+
+def _load_credentials() -> Credentials:
+    """Parse the service account credentials from SERVICE_ACCOUNT_JSON."""
+    if not SERVICE_ACCOUNT_JSON:
         raise HTTPException(status_code=500, detail="GOOGLE_SERVICE_ACCOUNT_JSON not set")
+    try:
+        # Allow passing either full JSON string or a file path
+        if SERVICE_ACCOUNT_JSON.strip().startswith("{"):
+            info = orjson.loads(SERVICE_ACCOUNT_JSON)
+            return Credentials.from_service_account_info(info, scopes=SCOPES)
+        return Credentials.from_service_account_file(SERVICE_ACCOUNT_JSON, scopes=SCOPES)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Invalid Google service account credentials: {e}")
+
+
+_http_local = threading.local()
+
+
+def _thread_http(creds: Credentials) -> google_auth_httplib2.AuthorizedHttp:
+    """Return this thread's authorized transport, creating it on first use.
+
+    httplib2.Http is not thread-safe, so the shared service objects get one
+    transport per worker thread; each keeps its TLS connections open across calls.
+    """
+    http = getattr(_http_local, "http", None)
+    if http is None:
+        http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+        _http_local.http = http
+    return http
+
+
+@lru_cache(maxsize=1)
+def _services():
+    """Build Sheets and Drive services once and reuse them across requests."""
+    creds = _load_credentials()
+
+    def request_builder(_http, *args, **kwargs):
+        return HttpRequest(_thread_http(creds), *args, **kwargs)
 
     try:
-        sheets_service = build("sheets", "v4", credentials=creds)
-        drive_service = build("drive", "v3", credentials=creds)
+        options = {"credentials": creds, "cache_discovery": False, "static_discovery": True, "requestBuilder": request_builder}
+        sheets_service = build("sheets", "v4", **options)
+        drive_service = build("drive", "v3", **options)
         return sheets_service, drive_service
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to initialize Google services: {e}")
 
 
+def get_google_services():
+    """Return the cached Sheets and Drive services."""
+    # Failures are not cached by lru_cache, so a bad config keeps raising until fixed
+    with _services_lock:
+        return _services()
+
+
+# Verified ID tokens keyed by a digest of the raw token: digest -> (exp, decoded claims)
+_token_cache: Dict[bytes, Tuple[float, Dict[str, Any]]] = {}
+_token_cache_lock = threading.Lock()
+TOKEN_EXPIRY_LEEWAY = 30  # seconds; treat tokens this close to expiry as expired
+
+
+def _prune_token_cache(now: float):
+    expired = [k for k, (exp, _) in _token_cache.items() if exp <= now + TOKEN_EXPIRY_LEEWAY]
+    for k in expired:
+        del _token_cache[k]
+
+
+def _decode_id_token(token: str) -> Dict[str, Any]:
+    """Verify a Firebase ID token against Google's cached public keys."""
+    if not FIREBASE_PROJECT_ID:
+        raise ValueError("FIREBASE_PROJECT_ID not set")
+    signing_key = jwks_client.get_signing_key_from_jwt(token)
+    decoded = jwt.decode(
+        token,
+        signing_key.key,
+        algorithms=["RS256"],
+        audience=FIREBASE_PROJECT_ID,
+        issuer=f"https://securetoken.google.com/{FIREBASE_PROJECT_ID}",
+        options={"require": ["exp", "iat", "sub"]},
+    )
+    if not decoded["sub"]:
+        raise ValueError("Token has an empty subject")
+    # Firebase exposes the user id as sub; keep the uid key firebase_admin provided
+    decoded["uid"] = decoded["sub"]
+    return decoded
+
+
 def verify_admin(authorization: Optional[str] = Header(None)) -> Optional[str]:
     """Verify Firebase ID token from Authorization: Bearer <token>. Returns uid."""
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing Authorization header")
-    parts = authorization.split()
-    if len(parts) != 2 or parts[0].lower() != "bearer":
+    token = authorization[7:].strip() if authorization[:7].lower() == "bearer " else ""
+    if not token:
         raise HTTPException(status_code=401, detail="Invalid Authorization header")
-    token = parts[1]
+
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.time()
+    with _token_cache_lock:
+        cached = _token_cache.get(key)
+    if cached and cached[0] > now + TOKEN_EXPIRY_LEEWAY:
+        return cached[1].get("uid")
+
     try:
-        decoded = fb_auth.verify_id_token(token)
-        return decoded.get("uid")
+        decoded = _decode_id_token(token)
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
 
+    with _token_cache_lock:
+        _prune_token_cache(now)
+        _token_cache[key] = (float(decoded.get("exp", 0)), decoded)
+    return decoded.get("uid")
+
+
+_master_sheet_ok = False
+
 
 def ensure_master_sheet(sheets_service):
+    global _master_sheet_ok
     if not MASTER_SPREADSHEET_ID:
         raise HTTPException(status_code=500, detail="MASTER_SPREADSHEET_ID not set")
-    # Optionally validate it exists by a simple get
+    if _master_sheet_ok:
+        return
+    # Validate it exists by a simple get, once per process
     try:
-        sheets_service.spreadsheets().get(spreadsheetId=MASTER_SPREADSHEET_ID).execute()
+        sheets_service.spreadsheets().get(spreadsheetId=MASTER_SPREADSHEET_ID, fields="spreadsheetId").execute()
     except HttpError as e:
         raise HTTPException(status_code=500, detail=f"Invalid MASTER_SPREADSHEET_ID: {e}")
+    _master_sheet_ok = True
 
 
 def create_sheet_tab_for_form(title: str, fields: List[Dict[str, Any]], sheet_name: Optional[str] = None) -> str:
@@ -144,27 +253,168 @@ def create_sheet_tab_for_form(title: str, fields: List[Dict[str, Any]], sheet_na
     return sheet_title
 
 
-def append_submission_to_sheet(sheet_name: str, fields: List[Dict[str, Any]], data: Dict[str, Any]):
+def _stringify(value: Any) -> Any:
+    """Flatten multi-value answers (checkbox groups) into a single cell."""
+    if isinstance(value, list):
+        return ", ".join(map(str, value))
+    return value
+
+
+def build_sheet_row(field_ids: List[str], data: Dict[str, Any]) -> List[Any]:
+    """Build a sheet row (Timestamp + one cell per field) for a submission."""
+    return [datetime.utcnow().isoformat()] + [_stringify(data.get(fid)) for fid in field_ids]
+
+
+def append_rows_to_sheet(sheet_name: str, rows: List[List[Any]]):
+    """Append several rows to a sheet tab in a single API call."""
     sheets_service, _ = get_google_services()
     ensure_master_sheet(sheets_service)
 
-    headers = ["Timestamp"] + [f.get("label", f.get("id")) for f in fields]
-    row = [datetime.utcnow().isoformat()]
-    for f in fields:
-        fid = f.get("id")
-        value = data.get(fid)
-        if isinstance(value, list):
-            value = ", ".join(map(str, value))
-        row.append(value)
-
     sheets_service.spreadsheets().values().append(
         spreadsheetId=MASTER_SPREADSHEET_ID,
         range=f"{sheet_name}!A1",
         valueInputOption="RAW",
-        body={"values": [row]},
+        body={"values": rows},
     ).execute()
 
 
+# --- Background writers ---
+# Sheet rows are queued as (sheet_name, row) and submission documents as dicts;
+# each queue is drained in batches by its own daemon thread so the request path
+# never waits on the Sheets API or a per-document Mongo insert.
+SHEET_FLUSH_INTERVAL = 1.0  # seconds to wait for a batch to fill up
+SHEET_MAX_BATCH = 50
+SUBMISSION_FLUSH_INTERVAL = 0.5
+SUBMISSION_MAX_BATCH = 200
+FLUSH_RETRY_BASE_DELAY = 0.5  # seconds; doubled after each consecutive failed flush
+FLUSH_RETRY_MAX_DELAY = 30.0
+SHUTDOWN_FLUSH_RETRIES = 3
+DUPLICATE_KEY_ERROR = 11000
+
+sheet_queue: "queue.Queue[Tuple[str, List[Any]]]" = queue.Queue()
+submission_doc_queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+_flusher_stop = threading.Event()
+_flusher_threads: List[threading.Thread] = []
+
+
+def _take_batch(q: queue.Queue, max_batch: int, timeout: float) -> List[Any]:
+    """Collect up to max_batch queued items, waiting at most `timeout` for them."""
+    try:
+        batch = [q.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+    deadline = time.monotonic() + timeout
+    while len(batch) < max_batch:
+        remaining = deadline - time.monotonic()
+        try:
+            batch.append(q.get(timeout=remaining) if remaining > 0 else q.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _flush_sheet_batch(batch: List[Tuple[str, List[Any]]]) -> List[Tuple[str, List[Any]]]:
+    grouped: Dict[str, List[List[Any]]] = {}
+    for sheet_name, row in batch:
+        grouped.setdefault(sheet_name, []).append(row)
+    for sheet_name, rows in grouped.items():
+        try:
+            append_rows_to_sheet(sheet_name, rows)
+        except Exception as e:
+            print("Sheet append error:", e)
+    return []
+
+
+def _flush_submission_batch(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insert queued submissions; return the documents that should be retried.
+
+    Ids are assigned before queueing, so a retried insert is idempotent: a
+    duplicate-key error just means an earlier attempt already wrote that document.
+    """
+    try:
+        db["submission"].insert_many(batch, ordered=False)
+    except BulkWriteError as e:
+        # With ordered=False only the listed documents failed; the rest are stored
+        for err in e.details.get("writeErrors", []):
+            if err.get("code") != DUPLICATE_KEY_ERROR:
+                print("Submission insert error:", batch[err["index"]]["_id"], err.get("errmsg"))
+    except Exception as e:
+        # Connection-level failure (AutoReconnect, ServerSelectionTimeoutError, ...)
+        print("Submission insert error, will retry:", e)
+        return batch
+    return []
+
+
+# (queue, flush function, max batch size, flush interval)
+_BACKGROUND_WRITERS = [
+    (submission_doc_queue, _flush_submission_batch, SUBMISSION_MAX_BATCH, SUBMISSION_FLUSH_INTERVAL),
+    (sheet_queue, _flush_sheet_batch, SHEET_MAX_BATCH, SHEET_FLUSH_INTERVAL),
+]
+
+
+def _requeue(q: queue.Queue, items: List[Any], failures: int) -> float:
+    """Put failed items back on the queue and return the backoff delay to wait."""
+    for item in items:
+        q.put_nowait(item)
+    return min(FLUSH_RETRY_BASE_DELAY * 2 ** (failures - 1), FLUSH_RETRY_MAX_DELAY)
+
+
+def _run_flusher(q: queue.Queue, flush, max_batch: int, interval: float):
+    failures = 0
+    while not _flusher_stop.is_set():
+        batch = _take_batch(q, max_batch, interval)
+        if not batch:
+            continue
+        retry = flush(batch)
+        if retry:
+            failures += 1
+            # wait() returns early on shutdown; stop_background_writers drains the rest
+            _flusher_stop.wait(_requeue(q, retry, failures))
+        else:
+            failures = 0
+
+
+def start_background_writers():
+    if any(t.is_alive() for t in _flusher_threads):
+        return
+    _flusher_stop.clear()
+    _flusher_threads.clear()
+    for writer in _BACKGROUND_WRITERS:
+        t = threading.Thread(target=_run_flusher, args=writer, name="background-writer", daemon=True)
+        t.start()
+        _flusher_threads.append(t)
+
+
+def stop_background_writers():
+    """Stop the flusher threads and write whatever is still queued."""
+    _flusher_stop.set()
+    for t in _flusher_threads:
+        t.join(timeout=5)
+    for q, flush, max_batch, _ in _BACKGROUND_WRITERS:
+        failures = 0
+        while True:
+            batch = _take_batch(q, max_batch, 0)
+            if not batch:
+                break
+            retry = flush(batch)
+            if not retry:
+                continue
+            failures += 1
+            if failures > SHUTDOWN_FLUSH_RETRIES:
+                print("Dropping unwritten items at shutdown:", [item.get("_id", item) if isinstance(item, dict) else item for item in retry])
+                continue
+            time.sleep(_requeue(q, retry, failures))
+
+
+def queue_submission(sub: SubmissionSchema) -> str:
+    """Queue a submission for bulk insert and return its pre-assigned id."""
+    doc = sub.model_dump()
+    now = datetime.now(timezone.utc)
+    doc.update(_id=ObjectId(), created_at=now, updated_at=now)
+    submission_doc_queue.put_nowait(doc)
+    return str(doc["_id"])
+
+
 def upload_file_to_drive(file: UploadFile) -> Optional[str]:
     """Upload file to Google Drive, return sharable link."""
     _, drive_service = get_google_services()
@@ -175,8 +425,17 @@ def upload_file_to_drive(file: UploadFile) -> Optional[str]:
         "name": file.filename,
         "parents": [DRIVE_FOLDER_ID]
     }
-    media = MediaIoBaseUpload(file.file, mimetype=file.content_type, resumable=False)
-    uploaded = drive_service.files().create(body=file_metadata, media_body=media, fields="id, webViewLink, webContentLink").execute()
+    # Stream the spooled temp file in chunks rather than buffering it into one request
+    media = MediaIoBaseUpload(
+        file.file,
+        mimetype=file.content_type or "application/octet-stream",
+        chunksize=DRIVE_UPLOAD_CHUNK_SIZE,
+        resumable=True,
+    )
+    upload_request = drive_service.files().create(body=file_metadata, media_body=media, fields="id, webViewLink, webContentLink")
+    uploaded = None
+    while uploaded is None:
+        _, uploaded = upload_request.next_chunk()
 
     # Make sure file is readable by link
     try:
@@ -186,6 +445,39 @@ def upload_file_to_drive(file: UploadFile) -> Optional[str]:
     return uploaded.get("webViewLink") or uploaded.get("webContentLink")
 
 
+@lru_cache(maxsize=4096)
+def _qr_png(url: str) -> bytes:
+    """Render a QR code for url as PNG bytes; output is deterministic so it is cached."""
+    buf = io.BytesIO()
+    segno.make(url, error="m").save(buf, kind="png", scale=10, border=4)
+    return buf.getvalue()
+
+
+def weak_etag(*parts: Any) -> str:
+    """Weak ETag derived from the given values (e.g. slug and updated_at)."""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match already covers etag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = {t.strip() for t in if_none_match.split(",")}
+    # Weak comparison per RFC 9110: W/"x" and "x" match
+    return "*" in tags or etag in tags or etag[2:] in tags
+
+
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+def make_share_slug(title: str) -> str:
+    """URL-safe slug from the form title plus a short random suffix."""
+    base = _SLUG_RE.sub("-", title.lower()).strip("-") or "form"
+    return f"{base}-{secrets.token_urlsafe(6)}"
+
+
 # --- Models ---
 class CreateFormRequest(BaseModel):
     title: str
@@ -198,6 +490,35 @@ class CreateFormResponse(BaseModel):
     sheet_name: Optional[str]
 
 
+# --- Lifecycle ---
+def ensure_indexes():
+    """Create the indexes the hot query paths rely on (no-op if they already exist)."""
+    if db is None:
+        return
+    indexes = [
+        ("submission", SUBMISSION_FORM_INDEX, {}),
+        ("form", [("share_slug", 1)], {"unique": True}),
+        ("form", FORM_OWNER_INDEX, {}),
+    ]
+    for collection, keys, options in indexes:
+        try:
+            db[collection].create_index(keys, **options)
+        except Exception as e:
+            # e.g. duplicate slugs already stored; keep serving without the index
+            print("Index creation error:", e)
+
+
+@app.on_event("startup")
+def on_startup():
+    ensure_indexes()
+    start_background_writers()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    stop_background_writers()
+
+
 # --- Routes ---
 @app.get("/")
 def read_root():
@@ -233,7 +554,7 @@ def create_form(payload: CreateFormRequest, uid: str = Depends(verify_admin)):
     sheet_name = create_sheet_tab_for_form(payload.title, payload.fields)
 
     # Create share slug
-    slug = f"{payload.title.lower().replace(' ', '-')}-{int(datetime.utcnow().timestamp())}"
+    slug = make_share_slug(payload.title)
 
     form_doc = FormSchema(
         title=payload.title,
@@ -250,36 +571,36 @@ def create_form(payload: CreateFormRequest, uid: str = Depends(verify_admin)):
 
 
 @app.get("/api/forms")
-def list_forms(uid: str = Depends(verify_admin)):
-    forms = get_documents("form")
-    # Filter by owner if provided
-    result = []
-    for f in forms:
-        item = {
-            "_id": str(f.get("_id")),
-            "title": f.get("title"),
-            "description": f.get("description"),
-            "share_slug": f.get("share_slug"),
-            "sheet_name": f.get("sheet_name"),
-            "created_at": f.get("created_at"),
-        }
-        result.append(item)
+def list_forms(
+    uid: str = Depends(verify_admin),
+    limit: int = Query(50, ge=1, le=200),
+    skip: int = Query(0, ge=0),
+    owner_only: bool = True,
+):
+    query = {"owner_uid": uid} if owner_only else {}
+    projection = {k: 1 for k in FORM_LIST_FIELDS}
+    cursor = db["form"].find(query, projection=projection).sort("created_at", -1).skip(skip).limit(limit)
+    result = [{"_id": str(f["_id"]), **{k: f.get(k) for k in FORM_LIST_FIELDS}} for f in cursor]
     return {"forms": result}
 
 
 @app.get("/api/forms/by-slug/{slug}")
-def get_form_by_slug(slug: str):
+def get_form_by_slug(slug: str, request: Request, response: Response):
     doc = db["form"].find_one({"share_slug": slug})
     if not doc:
         raise HTTPException(status_code=404, detail="Form not found")
+    headers = {"ETag": weak_etag(slug, doc["_id"], doc.get("updated_at")), "Cache-Control": FORM_CACHE_CONTROL}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     doc["_id"] = str(doc["_id"])
     return doc
 
 
 @app.post("/api/forms/{slug}/submit")
-async def submit_form(slug: str, request: Request):
+async def submit_form(slug: str, request: Request, sync: bool = False):
     # Find form
-    form_doc = db["form"].find_one({"share_slug": slug})
+    form_doc = await asyncio.to_thread(db["form"].find_one, {"share_slug": slug})
     if not form_doc:
         raise HTTPException(status_code=404, detail="Form not found")
 
@@ -293,20 +614,21 @@ async def submit_form(slug: str, request: Request):
     else:
         # Handle multipart form for file uploads
         form = await request.form()
+        uploads: List[Tuple[str, UploadFile]] = []
+        buckets: DefaultDict[str, List[str]] = defaultdict(list)
         for k, v in form.multi_items():
-            if isinstance(v, UploadFile):
+            # request.form() yields Starlette's UploadFile, which FastAPI's subclasses
+            if isinstance(v, StarletteUploadFile):
                 if v.filename:
-                    link = upload_file_to_drive(v)
-                    file_links[k] = link
+                    uploads.append((k, v))
             else:
-                # handle checkbox groups (multiple values)
-                if k in data:
-                    if isinstance(data[k], list):
-                        data[k].append(str(v))
-                    else:
-                        data[k] = [data[k], str(v)]
-                else:
-                    data[k] = str(v)
+                buckets[k].append(str(v))
+        # checkbox groups (multiple values) stay lists; single values are unwrapped
+        data = {k: v[0] if len(v) == 1 else v for k, v in buckets.items()}
+
+        # Upload files concurrently off the event loop
+        links = await asyncio.gather(*[asyncio.to_thread(upload_file_to_drive, v) for _, v in uploads])
+        file_links = {k: link for (k, _), link in zip(uploads, links)}
 
     # Basic required validation
     field_map = {f.get("id"): f for f in form_doc.get("fields", [])}
@@ -317,15 +639,15 @@ async def submit_form(slug: str, request: Request):
 
     # Store submission
     sub = SubmissionSchema(form_id=str(form_doc.get("_id")), data=data, file_links=file_links)
-    sub_id = create_document("submission", sub)
+    if sync:
+        sub_id = await asyncio.to_thread(create_document, "submission", sub)
+    else:
+        sub_id = queue_submission(sub)
 
-    # Append to Google Sheet
-    try:
-        combined = {**data, **{k: v for k, v in file_links.items()}}
-        append_submission_to_sheet(form_doc.get("sheet_name"), form_doc.get("fields", []), combined)
-    except Exception as e:
-        # log but don't block success
-        print("Sheet append error:", e)
+    # Queue the row for the background sheet writer; don't block success on Sheets
+    combined = {**data, **{k: v for k, v in file_links.items()}}
+    field_ids = [f.get("id") for f in form_doc.get("fields", [])]
+    sheet_queue.put_nowait((form_doc.get("sheet_name"), build_sheet_row(field_ids, combined)))
 
     return {"status": "ok", "submission_id": sub_id}
 
@@ -335,8 +657,18 @@ def form_analytics(slug: str, uid: str = Depends(verify_admin)):
     form_doc = db["form"].find_one({"share_slug": slug})
     if not form_doc:
         raise HTTPException(status_code=404, detail="Form not found")
-    count = db["submission"].count_documents({"form_id": str(form_doc["_id"])})
-    recent = list(db["submission"].find({"form_id": str(form_doc["_id"])}, sort=[("created_at", -1)]).limit(5))
+    # Count and latest submissions in one round-trip; the planner picks the
+    # (form_id, created_at desc) index from ensure_indexes() when it exists.
+    pipeline = [
+        {"$match": {"form_id": str(form_doc["_id"])}},
+        {"$facet": {
+            "count": [{"$count": "n"}],
+            "recent": [{"$sort": {"created_at": -1}}, {"$limit": 5}],
+        }},
+    ]
+    facets = next(db["submission"].aggregate(pipeline), {})
+    count = facets["count"][0]["n"] if facets.get("count") else 0
+    recent = facets.get("recent", [])
     for r in recent:
         r["_id"] = str(r["_id"])
     return {"count": count, "recent": recent}
@@ -347,31 +679,35 @@ def export_csv(slug: str, uid: str = Depends(verify_admin)):
     form_doc = db["form"].find_one({"share_slug": slug})
     if not form_doc:
         raise HTTPException(status_code=404, detail="Form not found")
-    subs = list(db["submission"].find({"form_id": str(form_doc["_id"])}))
+    form_id = str(form_doc["_id"])
     fields = [f.get("id") for f in form_doc.get("fields", [])]
+    # Only pull the fields the CSV is built from; field ids are client-supplied, so
+    # per-id "data.<fid>" paths could collide or be invalid and fail mid-stream
+    projection = {"_id": 0, "created_at": 1, "data": 1}
 
     def iter_rows():
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["timestamp"] + fields)
-        yield output.getvalue(); output.seek(0); output.truncate(0)
-        for s in subs:
-            row = [s.get("created_at").isoformat() if s.get("created_at") else ""]
-            for fid in fields:
-                val = s.get("data", {}).get(fid)
-                if isinstance(val, list):
-                    val = ", ".join(map(str, val))
-                row.append(val)
-            writer.writerow(row)
-            yield output.getvalue(); output.seek(0); output.truncate(0)
+        # Starlette runs this sync generator in its threadpool, so the cursor
+        # is consumed lazily off the event loop.
+        cursor = db["submission"].find({"form_id": form_id}, projection=projection).batch_size(CSV_CURSOR_BATCH_SIZE)
+        # Encode straight into a byte buffer so chunks go out without a further encode
+        output = io.BytesIO()
+        writer = csv.writer(io.TextIOWrapper(output, encoding="utf-8", newline="", write_through=True))
+        writer.writerow(["timestamp", *fields])
+        for s in cursor:
+            created_at = s.get("created_at")
+            answers = s.get("data", {})
+            writer.writerow([created_at.isoformat() if created_at else ""] + [_stringify(answers.get(fid)) for fid in fields])
+            if output.tell() >= CSV_CHUNK_SIZE:
+                yield output.getvalue(); output.seek(0); output.truncate(0)
+        yield output.getvalue()
     return StreamingResponse(iter_rows(), media_type="text/csv", headers={"Content-Disposition": f"attachment; filename={slug}.csv"})
 
 
 @app.get("/api/forms/{slug}/qr")
-def form_qr(slug: str):
+def form_qr(slug: str, request: Request):
     url = f"{PUBLIC_BASE_URL.rstrip('/')}/f/{slug}"
-    img = qrcode.make(url)
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
-    return StreamingResponse(buf, media_type="image/png")
+    # The image depends only on the URL, so it can be cached forever
+    headers = {"ETag": weak_etag(url), "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=_qr_png(url), media_type="image/png", headers=headers)